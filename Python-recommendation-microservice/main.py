@@ -1,14 +1,19 @@
 # main.py
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, NamedTuple
 import numpy as np
-import pandas as pd
+from scipy.sparse import csr_matrix, dok_matrix
+from numba import njit
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
-import requests
+from sklearn.preprocessing import normalize
+import httpx
+import orjson
+import asyncio
 import os
+import hashlib
 from datetime import datetime
 import logging
 
@@ -39,14 +44,16 @@ MIN_RATINGS_FOR_CF = 5  # Minimum ratings needed for collaborative filtering
 
 class RecommendationRequest(BaseModel):
     user_id: str
-    limit: Optional[int] = 10
-    recommendation_type: Optional[str] = "hybrid"  # collaborative, content, hybrid
+    limit: int = 10
+    recommendation_type: str = "hybrid"  # collaborative, content, hybrid
 
 class RecommendationItem(BaseModel):
     movieId: str
     score: float    
 
 class RecommendationResponse(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    
     recommendations: List[RecommendationItem]  # Changed from recommended_movies
     userId: str  # Changed from user_id
     algorithm: str = "hybrid"
@@ -55,7 +62,7 @@ class RecommendationResponse(BaseModel):
 class Rating(BaseModel):
     user_id: str
     movie_id: str
-    score: float
+    score: float = Field(ge=1, le=5)  # Same bounds as the backend's CreateRatingDto
 
 class Movie(BaseModel):
     id: str
@@ -64,51 +71,163 @@ class Movie(BaseModel):
     category: str
     release_date: str
 
+class RatingsColumns(NamedTuple):
+    """Ratings stored column-wise, with user/movie ids factorized into integer codes"""
+    user_ids: np.ndarray       # object[K]
+    movie_ids: np.ndarray      # object[K]
+    scores: np.ndarray         # float64[K], cast to float32 only for the CSR matrix
+    user_idx: np.ndarray       # int32[K], codes into unique_users
+    movie_idx: np.ndarray      # int32[K], codes into unique_movies
+    unique_users: np.ndarray   # object[N], sorted
+    unique_movies: np.ndarray  # object[M], sorted
+
+def make_ratings_columns(user_ids, movie_ids, scores) -> RatingsColumns:
+    """Build RatingsColumns from per-rating user ids, movie ids and scores"""
+    user_ids = np.asarray(user_ids, dtype=object)
+    movie_ids = np.asarray(movie_ids, dtype=object)
+    unique_users, user_idx = np.unique(user_ids, return_inverse=True)
+    unique_movies, movie_idx = np.unique(movie_ids, return_inverse=True)
+    return RatingsColumns(
+        user_ids=user_ids,
+        movie_ids=movie_ids,
+        scores=np.asarray(scores, dtype=np.float64),
+        user_idx=user_idx.astype(np.int32),
+        movie_idx=movie_idx.astype(np.int32),
+        unique_users=unique_users,
+        unique_movies=unique_movies
+    )
+
 # In-memory cache for performance
-ratings_cache = []
+ratings_cache = make_ratings_columns([], [], [])
 movies_cache = []
 last_cache_update = None
 CACHE_DURATION = 300  # 5 minutes
 
+# Shared HTTP client for backend calls, reuses connections across requests.
+# Created on startup and closed on shutdown, so each app lifespan gets a live client.
+http_client: Optional[httpx.AsyncClient] = None
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the k highest finite scores, best first"""
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.array([], dtype=int)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+def popularity_scores(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Popularity score: average rating * log(rating count + 1)"""
+    return sums / np.maximum(counts, 1) * np.log(counts + 1)
+
+@njit(cache=True)
+def aggregate_similar_ratings(indptr, indices, data, similar_users_idx, sim_weights, user_seen_mask):
+    """Sum similarity-weighted ratings of similar users per unseen movie, with rating counts"""
+    n_movies = user_seen_mask.shape[0]
+    scores = np.zeros(n_movies, dtype=np.float32)
+    counts = np.zeros(n_movies, dtype=np.int32)
+    for i in range(similar_users_idx.shape[0]):
+        u = similar_users_idx[i]
+        w = sim_weights[i]
+        for j in range(indptr[u], indptr[u + 1]):
+            m = indices[j]
+            if data[j] > 0 and not user_seen_mask[m]:
+                scores[m] += data[j] * w
+                counts[m] += 1
+    return scores, counts
+
 class RecommendationEngine:
     def __init__(self):
         self.user_item_matrix = None
+        self.user_index = {}
+        self.movie_index = {}
+        self.movie_ids = None
+        self.user_to_ratings = {}
+        self.movie_popularity_scores = None
+        self._popularity_order = None
         self.movie_features = None
         self.tfidf_vectorizer = None
-        self.content_similarity_matrix = None
+        self.movie_id_to_idx = {}
+        self._content_fp = None
+        self._ratings_etag = None
+        self._movies_etag = None
+        self._load_lock = asyncio.Lock()
+        self._load_generation = 0
+        self._ratings_rebuild_needed = True
+        self._content_rebuild_needed = True
+        
+    async def _conditional_get(self, path: str, etag: Optional[str], **kwargs):
+        """GET from the backend, asking for a 304 if the payload still matches etag"""
+        headers = {"If-None-Match": etag} if etag else {}
+        return await http_client.get(f"{NEST_BACKEND_URL}{path}", headers=headers, **kwargs)
+        
+    async def ensure_ready(self):
+        """Refresh data if needed and rebuild the recommendation matrices when it changed
+        
+        Rating state is only rebuilt when the ratings payload changed, so deltas from
+        /ratings/delta survive until the backend sends a new ratings snapshot. /stats
+        and /health report that snapshot and do not include pending deltas.
+        """
+        await self.load_data()
+        if self._ratings_rebuild_needed:
+            self.build_rating_indices()
+            self.build_user_item_matrix()
+            self._ratings_rebuild_needed = False
+        if self._content_rebuild_needed:
+            self.build_content_features()
+            self._content_rebuild_needed = False
         
     async def load_data(self):
-        """Load ratings and movies data from Nest.js backend"""
+        """Load ratings and movies data from Nest.js backend, one refresh at a time"""
+        generation = self._load_generation
+        async with self._load_lock:
+            # Another request already refreshed the data while this one was waiting
+            if self._load_generation != generation:
+                return
+            await self._fetch_data()
+            self._load_generation += 1
+        
+    async def _fetch_data(self):
+        """Fetch ratings and movies data from Nest.js backend into the caches"""
         global ratings_cache, movies_cache, last_cache_update
         
+        ratings_changed = movies_changed = True
         try:
             # Check if cache is still valid
             if (last_cache_update and 
                 (datetime.now() - last_cache_update).seconds < CACHE_DURATION):
                 return
             
-            # Fetch ratings data from the new endpoint
-            ratings_response = requests.get(f"{NEST_BACKEND_URL}/ratings/all", timeout=10)
-            if ratings_response.status_code == 200:
-                ratings_data = ratings_response.json()
-                # Transform the data to match our expected format
-                ratings_cache = [
-                    {
-                        "userId": rating["userId"],
-                        "movieId": rating["movieId"], 
-                        "score": rating["score"]
-                    }
-                    for rating in ratings_data
-                ]
-                logger.info(f"Successfully loaded {len(ratings_cache)} ratings from backend")
+            # Fetch ratings and movies data concurrently, unchanged payloads come back as 304
+            ratings_response, movies_response = await asyncio.gather(
+                self._conditional_get("/ratings/all", self._ratings_etag),
+                self._conditional_get("/movies", self._movies_etag)
+            )
+            
+            if ratings_response.status_code == 304:
+                ratings_changed = False
+                logger.info("Ratings unchanged on backend, keeping cached data")
+            elif ratings_response.status_code == 200:
+                ratings_data = orjson.loads(ratings_response.content)
+                ratings_cache = make_ratings_columns(
+                    [r["userId"] for r in ratings_data],
+                    [r["movieId"] for r in ratings_data],
+                    np.fromiter((r["score"] for r in ratings_data), dtype=np.float64, count=len(ratings_data))
+                )
+                self._ratings_etag = ratings_response.headers.get("etag")
+                logger.info(f"Successfully loaded {len(ratings_cache.scores)} ratings from backend")
             else:
                 logger.warning(f"Could not fetch ratings from backend (status: {ratings_response.status_code}), using mock data")
                 ratings_cache = self._generate_mock_ratings()
+                self._ratings_etag = None
             
-            # Fetch movies data
-            movies_response = requests.get(f"{NEST_BACKEND_URL}/movies", timeout=10)
-            if movies_response.status_code == 200:
-                movies_data = movies_response.json()
+            if movies_response.status_code == 304:
+                movies_changed = False
+                logger.info("Movies unchanged on backend, keeping cached data")
+            elif movies_response.status_code == 200:
+                movies_data = orjson.loads(movies_response.content)
                 # Transform the data to match our expected format
                 movies_cache = []
                 for movie in movies_data:
@@ -126,19 +245,23 @@ class RecommendationEngine:
                         "category": category_name,
                         "releaseDate": movie.get("releaseDate", "")
                     })
+                self._movies_etag = movies_response.headers.get("etag")
                 logger.info(f"Successfully loaded {len(movies_cache)} movies from backend")
             else:
                 logger.warning(f"Could not fetch movies from backend (status: {movies_response.status_code}), using mock data")
                 movies_cache = self._generate_mock_movies()
+                self._movies_etag = None
             
             last_cache_update = datetime.now()
-            logger.info(f"Data loaded successfully: {len(ratings_cache)} ratings, {len(movies_cache)} movies")
+            logger.info(f"Data loaded successfully: {len(ratings_cache.scores)} ratings, {len(movies_cache)} movies")
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error loading data from backend: {e}")
             # Use mock data as fallback
             ratings_cache = self._generate_mock_ratings()
             movies_cache = self._generate_mock_movies()
+            self._ratings_etag = self._movies_etag = None
+            ratings_changed = movies_changed = True
             logger.info("Using mock data due to network error")
             
         except Exception as e:
@@ -146,64 +269,141 @@ class RecommendationEngine:
             # Use mock data as fallback
             ratings_cache = self._generate_mock_ratings()
             movies_cache = self._generate_mock_movies()
+            self._ratings_etag = self._movies_etag = None
+            ratings_changed = movies_changed = True
             logger.info("Using mock data due to unexpected error")
+        
+        if ratings_changed:
+            self._ratings_rebuild_needed = True
+        if movies_changed:
+            self._content_rebuild_needed = True
     
     def _generate_mock_ratings(self):
         """Generate mock ratings data for testing"""
-        mock_ratings = []
-        users = [f"user_{i}" for i in range(1, 21)]
-        movies = [f"movie_{i}" for i in range(1, 51)]
-        
-        np.random.seed(42)
-        for user in users:
-            # Each user rates 10-30 movies
-            num_ratings = np.random.randint(10, 31)
-            user_movies = np.random.choice(movies, num_ratings, replace=False)
-            for movie in user_movies:
-                rating = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.1, 0.2, 0.3, 0.3])
-                mock_ratings.append({
-                    "userId": user,
-                    "movieId": movie,
-                    "score": rating
-                })
-        
-        return mock_ratings
+        n_users, n_movies = 20, 50
+        rng = np.random.default_rng(42)
+        
+        # Each user rates 10-30 distinct movies: take a prefix of a random permutation per user
+        num_ratings = rng.integers(10, 31, n_users)
+        permutations = rng.random((n_users, n_movies)).argsort(axis=1)
+        rated = np.arange(n_movies) < num_ratings[:, None]
+        user_idx = np.nonzero(rated)[0]
+        movie_idx = permutations[rated]
+        scores = rng.choice([1, 2, 3, 4, 5], size=len(user_idx), p=[0.1, 0.1, 0.2, 0.3, 0.3])
+        
+        users = np.array([f"user_{i}" for i in range(1, n_users + 1)], dtype=object)
+        movies = np.array([f"movie_{i}" for i in range(1, n_movies + 1)], dtype=object)
+        return make_ratings_columns(users[user_idx], movies[movie_idx], scores)
     
     def _generate_mock_movies(self):
         """Generate mock movies data for testing"""
         categories = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Romance"]
-        mock_movies = []
+        n_movies = 50
+        rng = np.random.default_rng(42)
         
-        for i in range(1, 51):
-            category = np.random.choice(categories)
-            mock_movies.append({
+        movie_categories = rng.choice(categories, n_movies).tolist()
+        years = rng.integers(0, 4, n_movies).tolist()
+        months = rng.integers(1, 13, n_movies).tolist()
+        
+        return [
+            {
                 "id": f"movie_{i}",
                 "title": f"Movie {i}",
                 "description": f"This is a {category.lower()} movie with exciting plot and great characters.",
                 "category": category,
-                "releaseDate": f"202{np.random.randint(0, 4)}-{np.random.randint(1, 13):02d}-01"
-            })
-        
-        return mock_movies
+                "releaseDate": f"202{year}-{month:02d}-01"
+            }
+            for i, category, year, month in zip(range(1, n_movies + 1), movie_categories, years, months)
+        ]
+    
+    def build_rating_indices(self):
+        """Precompute per-user ratings and movie popularity from ratings_cache"""
+        users, movies = ratings_cache.unique_users, ratings_cache.unique_movies
+        u_idx, m_idx, scores = ratings_cache.user_idx, ratings_cache.movie_idx, ratings_cache.scores
+        
+        self.user_index = {u: i for i, u in enumerate(users)}
+        self.movie_index = {m: i for i, m in enumerate(movies)}
+        self.movie_ids = movies
+        
+        # Group each user's (movie_idx, score) pairs in a single pass
+        order = np.argsort(u_idx, kind='stable')
+        bounds = np.cumsum(np.bincount(u_idx, minlength=len(users)))[:-1]
+        self.user_to_ratings = dict(zip(
+            users,
+            zip(np.split(m_idx[order], bounds), np.split(scores[order], bounds))
+        ))
+        
+        counts = np.bincount(m_idx, minlength=len(movies))
+        sums = np.bincount(m_idx, weights=scores, minlength=len(movies))
+        self.movie_popularity_scores = popularity_scores(sums, counts)
+        self._popularity_order = np.argsort(-self.movie_popularity_scores, kind='stable')
+        
+        # The user-item matrix is rebuilt lazily from the new codes
+        self.user_item_matrix = None
     
     def build_user_item_matrix(self):
         """Build user-item matrix for collaborative filtering"""
-        if not ratings_cache:
+        if self.movie_ids is None:
             return None
         
-        # Create DataFrame from ratings
-        df = pd.DataFrame(ratings_cache)
-        df.columns = ['user_id', 'movie_id', 'rating']
-        
-        # Create user-item matrix
-        self.user_item_matrix = df.pivot_table(
-            index='user_id', 
-            columns='movie_id', 
-            values='rating'
-        ).fillna(0)
+        # Sparse float32 user-item matrix, only nonzero ratings are stored
+        self.user_item_matrix = csr_matrix(
+            (ratings_cache.scores, (ratings_cache.user_idx, ratings_cache.movie_idx)),
+            shape=(len(self.user_index), len(self.movie_ids)),
+            dtype=np.float32
+        )
         
         return self.user_item_matrix
     
+    def apply_rating_deltas(self, deltas: List[Rating]):
+        """Merge new or updated ratings into the user-item matrix without a full rebuild
+        
+        Deletions are not supported here, a removed rating drops out on the next
+        ratings reload from the backend. Returns the number of distinct cells written.
+        """
+        if self.user_item_matrix is None and self.build_user_item_matrix() is None:
+            return 0
+        
+        # Grow the index for users and movies not seen in the last full load
+        new_movies = []
+        for delta in deltas:
+            if delta.user_id not in self.user_index:
+                self.user_index[delta.user_id] = len(self.user_index)
+            if delta.movie_id not in self.movie_index:
+                self.movie_index[delta.movie_id] = len(self.movie_index)
+                new_movies.append(delta.movie_id)
+        if new_movies:
+            self.movie_ids = np.append(self.movie_ids, new_movies)
+            self.movie_popularity_scores = np.append(self.movie_popularity_scores, np.zeros(len(new_movies)))
+        shape = (len(self.user_index), len(self.movie_index))
+        self.user_item_matrix.resize(shape)
+        
+        # Stage the deltas in a DOK sidecar, then overwrite the touched cells in one pass
+        pending = dok_matrix(shape, dtype=np.float32)
+        for delta in deltas:
+            pending[self.user_index[delta.user_id], self.movie_index[delta.movie_id]] = delta.score
+        pending = pending.tocsr()
+        touched = pending.copy()
+        touched.data[:] = 1
+        self.user_item_matrix = (
+            self.user_item_matrix - self.user_item_matrix.multiply(touched) + pending
+        ).tocsr()
+        self.user_item_matrix.eliminate_zeros()
+        
+        # Refresh per-user ratings and popularity only where ratings changed
+        for user_id in {delta.user_id for delta in deltas}:
+            row = self.user_item_matrix.getrow(self.user_index[user_id])
+            self.user_to_ratings[user_id] = (row.indices, row.data)
+        
+        touched_movies = np.unique(pending.indices)
+        columns = self.user_item_matrix[:, touched_movies]
+        counts = columns.getnnz(axis=0)
+        sums = np.asarray(columns.sum(axis=0)).ravel()
+        self.movie_popularity_scores[touched_movies] = popularity_scores(sums, counts)
+        self._popularity_order = np.argsort(-self.movie_popularity_scores, kind='stable')
+        
+        return pending.nnz
+    
     def build_content_features(self):
         """Build content-based features matrix"""
         if not movies_cache:
@@ -215,132 +415,113 @@ class RecommendationEngine:
             text = f"{movie['title']} {movie['description']} {movie['category']}"
             movie_texts.append(text)
         
+        # Skip the refit when the movie catalog has not changed
+        fingerprint = hashlib.sha1(
+            "\n".join(f"{m['id']}\t{t}" for m, t in zip(movies_cache, movie_texts)).encode()
+        ).hexdigest()
+        if fingerprint == self._content_fp and self.movie_features is not None:
+            return self.movie_features
+        
         # Use TF-IDF to create feature vectors
         self.tfidf_vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words='english',
-            ngram_range=(1, 2)
+            ngram_range=(1, 2),
+            dtype=np.float32
         )
         
         tfidf_matrix = self.tfidf_vectorizer.fit_transform(movie_texts)
         
-        # Calculate content similarity matrix
-        self.content_similarity_matrix = cosine_similarity(tfidf_matrix)
+        # Keep L2-normalized sparse features; similarities are computed on demand
+        self.movie_features = normalize(tfidf_matrix, norm='l2', copy=False)
+        self.movie_id_to_idx = {m['id']: i for i, m in enumerate(movies_cache)}
+        self._content_fp = fingerprint
         
-        return self.content_similarity_matrix
+        return self.movie_features
     
     def collaborative_filtering_recommendations(self, user_id: str, limit: int = 10):
         """Generate recommendations using collaborative filtering with scores"""
         if self.user_item_matrix is None:
             self.build_user_item_matrix()
         
-        if user_id not in self.user_item_matrix.index:
+        if user_id not in self.user_index:
             return []
         
-        # Calculate user similarity
-        user_ratings = self.user_item_matrix.loc[user_id].values.reshape(1, -1)
-        user_similarity = cosine_similarity(user_ratings, self.user_item_matrix.values)[0]
+        u_idx = self.user_index[user_id]
+        user_row = self.user_item_matrix.getrow(u_idx)
+        
+        # Calculate user similarity (sparse x sparse, touches only nonzero ratings)
+        user_similarity = cosine_similarity(
+            user_row, self.user_item_matrix, dense_output=True
+        ).ravel()
         
         # Get similar users (excluding the user itself)
-        similar_users_idx = np.argsort(user_similarity)[::-1][1:11]  # Top 10 similar users
+        candidate_similarity = user_similarity.copy()
+        candidate_similarity[u_idx] = -np.inf
+        similar_users_idx = top_k_indices(candidate_similarity, 10)  # Top 10 similar users
+        
+        # Aggregate weighted ratings of similar users over movies the user has not rated
+        user_seen_mask = np.zeros(len(self.movie_ids), dtype=np.bool_)
+        user_seen_mask[user_row.indices] = True
+        weighted_sums, rating_counts = aggregate_similar_ratings(
+            self.user_item_matrix.indptr,
+            self.user_item_matrix.indices,
+            self.user_item_matrix.data,
+            similar_users_idx,
+            user_similarity[similar_users_idx].astype(np.float32),
+            user_seen_mask
+        )
         
-        # Get movies rated by similar users but not by target user
-        user_movies = set(self.user_item_matrix.columns[self.user_item_matrix.loc[user_id] > 0])
-        recommendations = {}
+        # Average weighted ratings, keeping only movies rated by similar users
+        movie_scores = np.full(len(self.movie_ids), -np.inf)
+        rated = rating_counts > 0
+        movie_scores[rated] = weighted_sums[rated] / rating_counts[rated]
         
-        for idx in similar_users_idx:
-            similar_user = self.user_item_matrix.index[idx]
-            similar_user_movies = self.user_item_matrix.loc[similar_user]
-            
-            for movie_id, rating in similar_user_movies.items():
-                if rating > 0 and movie_id not in user_movies:
-                    if movie_id not in recommendations:
-                        recommendations[movie_id] = []
-                    recommendations[movie_id].append(rating * user_similarity[idx])
-        
-        # Calculate average weighted ratings
-        movie_scores = {}
-        for movie_id, scores in recommendations.items():
-            movie_scores[movie_id] = np.mean(scores)
-        
-        # Sort and return top recommendations with scores
-        sorted_recommendations = sorted(movie_scores.items(), key=lambda x: x[1], reverse=True)
-        return [{"movieId": movie_id, "score": float(score)} for movie_id, score in sorted_recommendations[:limit]]
+        # Select and return top recommendations with scores
+        top_idx = top_k_indices(movie_scores, limit)
+        return [{"movieId": self.movie_ids[i], "score": float(movie_scores[i])} for i in top_idx]
     
     def content_based_recommendations(self, user_id: str, limit: int = 10):
         """Generate recommendations using content-based filtering with scores"""
-        if self.content_similarity_matrix is None:
+        if self.movie_features is None:
             self.build_content_features()
         
         # Get user's rated movies
-        user_ratings = [r for r in ratings_cache if r['userId'] == user_id]
-        if not user_ratings:
+        user_movies, user_scores = self.user_to_ratings.get(user_id, ((), ()))
+        if len(user_movies) == 0:
             return []
+        rated_ids = self.movie_ids[user_movies]
         
         # Get highly rated movies by user (rating >= 4)
-        liked_movies = [r['movieId'] for r in user_ratings if r['score'] >= 4]
-        if not liked_movies:
+        liked_idx = [
+            self.movie_id_to_idx[m] for m, score in zip(rated_ids, user_scores)
+            if score >= 4 and m in self.movie_id_to_idx
+        ]
+        if not liked_idx:
             return []
         
-        # Find similar movies based on content
-        movie_ids = [m['id'] for m in movies_cache]
-        recommendations = {}
-        
-        for liked_movie in liked_movies:
-            if liked_movie in movie_ids:
-                movie_idx = movie_ids.index(liked_movie)
-                similar_scores = self.content_similarity_matrix[movie_idx]
-                
-                for i, score in enumerate(similar_scores):
-                    movie_id = movie_ids[i]
-                    if movie_id != liked_movie and movie_id not in [r['movieId'] for r in user_ratings]:
-                        if movie_id not in recommendations:
-                            recommendations[movie_id] = []
-                        recommendations[movie_id].append(score)
-        
-        # Calculate average similarity scores
-        movie_scores = {}
-        for movie_id, scores in recommendations.items():
-            movie_scores[movie_id] = np.mean(scores)
-        
-        # Sort and return top recommendations with scores
-        sorted_recommendations = sorted(movie_scores.items(), key=lambda x: x[1], reverse=True)
-        return [{"movieId": movie_id, "score": float(score)} for movie_id, score in sorted_recommendations[:limit]]
+        # Similarity of liked movies against the catalog, shape (len(liked), N)
+        similarity_rows = (self.movie_features[liked_idx] @ self.movie_features.T).toarray()
+        
+        # Average similarity scores, excluding movies the user already rated
+        movie_scores = similarity_rows.mean(axis=0)
+        rated_idx = [self.movie_id_to_idx[m] for m in rated_ids if m in self.movie_id_to_idx]
+        movie_scores[rated_idx] = -np.inf
+        
+        # Select and return top recommendations with scores
+        top_idx = top_k_indices(movie_scores, limit)
+        return [{"movieId": movies_cache[i]['id'], "score": float(movie_scores[i])} for i in top_idx]
     
     def get_popular_movies_fallback(self, limit: int = 10):
         """Get popular movies as fallback when no personalized recommendations are available"""
         if not movies_cache:
             return []
         
-        # Calculate movie popularity based on ratings
-        movie_popularity = {}
-        movie_avg_rating = {}
-        
-        for rating in ratings_cache:
-            movie_id = rating['movieId']
-            score = rating['score']
-            
-            if movie_id not in movie_popularity:
-                movie_popularity[movie_id] = []
-            movie_popularity[movie_id].append(score)
-        
-        # Calculate average rating and rating count for each movie
-        popular_movies = []
-        for movie_id, ratings in movie_popularity.items():
-            avg_rating = np.mean(ratings)
-            rating_count = len(ratings)
-            
-            # Simple popularity score: average rating * log(rating count + 1)
-            # This favors movies with higher ratings and more ratings
-            popularity_score = avg_rating * np.log(rating_count + 1)
-            
-            popular_movies.append({
-                "movieId": movie_id,
-                "score": float(popularity_score)
-            })
-        
-        # Sort by popularity score and return top movies
-        popular_movies.sort(key=lambda x: x['score'], reverse=True)
+        # Take the top movies from the precomputed popularity order
+        popular_movies = [
+            {"movieId": self.movie_ids[i], "score": float(self.movie_popularity_scores[i])}
+            for i in self._popularity_order[:limit]
+        ]
         
         # If we don't have enough rated movies, fill with random movies from cache
         if len(popular_movies) < limit:
@@ -357,7 +538,8 @@ class RecommendationEngine:
     def hybrid_recommendations(self, user_id: str, limit: int = 10):
         """Generate recommendations using hybrid approach with fallback"""
         # Get user's rating count
-        user_rating_count = len([r for r in ratings_cache if r['userId'] == user_id])
+        user_movies, _ = self.user_to_ratings.get(user_id, ((), ()))
+        user_rating_count = len(user_movies)
         
         recommendations = []
         
@@ -399,13 +581,13 @@ class RecommendationEngine:
     async def test_backend_connection(self):
         """Test connection to Nest.js backend"""
         try:
-            # Test ratings endpoint
-            ratings_response = requests.get(f"{NEST_BACKEND_URL}/ratings/stats", timeout=5)
+            # Test ratings and movies endpoints concurrently
+            ratings_response, movies_response = await asyncio.gather(
+                http_client.get(f"{NEST_BACKEND_URL}/ratings/stats", timeout=5),
+                self._conditional_get("/movies", self._movies_etag, timeout=5)
+            )
             ratings_status = ratings_response.status_code == 200
-            
-            # Test movies endpoint  
-            movies_response = requests.get(f"{NEST_BACKEND_URL}/movies", timeout=5)
-            movies_status = movies_response.status_code == 200
+            movies_status = movies_response.status_code in (200, 304)
             
             return {
                 "backend_url": NEST_BACKEND_URL,
@@ -428,8 +610,18 @@ rec_engine = RecommendationEngine()
 
 @app.on_event("startup")
 async def startup_event():
-    """Load data on startup"""
-    await rec_engine.load_data()
+    """Open the backend HTTP client and load data on startup"""
+    global http_client
+    http_client = httpx.AsyncClient(timeout=10)
+    await rec_engine.ensure_ready()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared backend HTTP client"""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
 
 @app.get("/")
 async def root():
@@ -449,7 +641,7 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "data_status": {
-            "ratings_count": len(ratings_cache),
+            "ratings_count": len(ratings_cache.scores),
             "movies_count": len(movies_cache),
             "last_update": last_cache_update.isoformat() if last_cache_update else None
         }
@@ -465,7 +657,7 @@ async def get_recommendations(
     """Generate movie recommendations for a user"""
     try:
         # Refresh data if needed
-        await rec_engine.load_data()
+        await rec_engine.ensure_ready()
         
         # Generate recommendations based on type
         if type == "collaborative":
@@ -491,7 +683,7 @@ async def post_recommendations(request: RecommendationRequest):
     """Generate movie recommendations for a user (POST method)"""
     try:
         # Refresh data if needed
-        await rec_engine.load_data()
+        await rec_engine.ensure_ready()
         
         # Generate recommendations based on type
         if request.recommendation_type == "collaborative":
@@ -508,16 +700,32 @@ async def post_recommendations(request: RecommendationRequest):
             )
         
         return RecommendationResponse(
-            user_id=request.user_id,
-            recommended_movies=recommendations,
-            recommendation_type=request.recommendation_type,
-            timestamp=datetime.now().isoformat()
+            userId=request.user_id,
+            recommendations=recommendations,
+            algorithm=request.recommendation_type,
+            generatedAt=datetime.now().isoformat()
         )
         
     except Exception as e:
         logger.error(f"Error generating recommendations for user {request.user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ratings/delta")
+async def post_rating_deltas(deltas: List[Rating]):
+    """Apply new or updated ratings to the collaborative filtering model"""
+    try:
+        await rec_engine.ensure_ready()
+        applied = rec_engine.apply_rating_deltas(deltas)
+        
+        return {
+            "applied": applied,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error applying rating deltas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Add a new endpoint to test backend connectivity
 @app.get("/backend-status")
 async def get_backend_status():
@@ -531,25 +739,26 @@ async def get_backend_status():
 @app.get("/stats")
 async def get_stats():
     """Get recommendation service statistics"""
-    await rec_engine.load_data()
+    await rec_engine.ensure_ready()
     
     # Calculate some basic stats
-    total_ratings = len(ratings_cache)
+    total_ratings = len(ratings_cache.scores)
     total_movies = len(movies_cache)
-    unique_users = len(set(r['userId'] for r in ratings_cache))
+    unique_users = len(ratings_cache.unique_users)
     
     # Rating distribution
-    rating_dist = {}
-    for rating in ratings_cache:
-        score = rating['score']
-        rating_dist[score] = rating_dist.get(score, 0) + 1
+    values, counts = np.unique(ratings_cache.scores, return_counts=True)
+    rating_dist = {
+        int(v) if v.is_integer() else v: c
+        for v, c in zip(values.tolist(), counts.tolist())
+    }
     
     return {
         "total_ratings": total_ratings,
         "total_movies": total_movies,
         "unique_users": unique_users,
         "rating_distribution": rating_dist,
-        "average_rating": np.mean([r['score'] for r in ratings_cache]) if ratings_cache else 0
+        "average_rating": float(ratings_cache.scores.mean()) if total_ratings else 0
     }
 
 if __name__ == "__main__":